@@ -6,6 +6,9 @@ import plotly.express as px
 import plotly.graph_objects as go
 import google.generativeai as genai
 from datetime import datetime, timedelta
+from backtest import run_backtest
+from montecarlo import MIN_HISTORY_DAYS, SIM_METHODS, load_return_matrix, run_simulation
+from positions import PositionStore
 
 st.set_page_config(page_title="가족 자산 대시보드", page_icon="💰", layout="wide")
 
@@ -31,6 +34,10 @@ if "show_detail" not in st.session_state:
     st.session_state.show_detail = False
 if "show_mdd" not in st.session_state:
     st.session_state.show_mdd = False
+if "show_backtest" not in st.session_state:
+    st.session_state.show_backtest = False
+if "show_mc" not in st.session_state:
+    st.session_state.show_mc = False
 
 st.sidebar.markdown("### 🌐 필수 투자 참고 사이트")
 st.sidebar.link_button("1. 🏦 금리변동예상 (FedWatch)", "https://www.cmegroup.com/markets/interest-rates/cme-fedwatch-tool.html", use_container_width=True)
@@ -107,6 +114,9 @@ if not os.path.exists(RECURRING_FILE):
     df_rec_init.loc[0] = ["아내", "연금계좌", "367380", "2026-02-01", "", "매일(영업일)", 1, "연금저축 자동모으기"]
     df_rec_init.to_csv(RECURRING_FILE, index=False, encoding='utf-8-sig')
 
+# 아래에서 장부를 읽기 직전의 파일 상태를 기억해 두어야, 저장 전에 다른 세션이 먼저 저장했는지 알 수 있습니다.
+position_store = PositionStore(PORTFOLIO_FILE, DEPOSIT_FILE).load().mark_read()
+
 df_stock = pd.read_csv(PORTFOLIO_FILE, dtype={"종목코드(6자리)": str, "거래일자": str, "메모": str}, encoding='utf-8-sig')
 df_dep = pd.read_csv(DEPOSIT_FILE, dtype={"입금일자": str, "메모": str}, encoding='utf-8-sig')
 df_rec = pd.read_csv(RECURRING_FILE, dtype={"종목코드(6자리)": str, "시작일자": str, "최근적용일자": str}, encoding='utf-8-sig')
@@ -173,7 +183,7 @@ with tab1:
                 new_row = pd.DataFrame([{"소유자": final_owner, "계좌명": final_acc, "거래종류": new_type, "종목코드(6자리)": final_code, "거래일자": new_date.strftime("%Y-%m-%d"), "거래단가": new_price, "수량": new_qty, "메모": new_memo}])
                 df_to_save = df_stock.drop(columns=['종목명'], errors='ignore')
                 df_stock_updated = pd.concat([new_row, df_to_save], ignore_index=True)
-                df_stock_updated.to_csv(PORTFOLIO_FILE, index=False, encoding='utf-8-sig')
+                position_store.save_trades(df_stock_updated, new_row)
                 
                 keys_to_clear = ["sel_owner", "new_owner", "sel_acc", "new_acc", "new_type", "sel_code", "new_code", "new_date", "new_price", "new_qty", "new_memo"]
                 for k in keys_to_clear:
@@ -219,7 +229,7 @@ with tab2:
             if final_dep_owner and final_dep_acc and new_dep_amt > 0:
                 new_row_dep = pd.DataFrame([{"소유자": final_dep_owner, "계좌명": final_dep_acc, "입금일자": new_dep_date.strftime("%Y-%m-%d"), "입금액": new_dep_amt, "메모": new_dep_memo}])
                 df_dep_updated = pd.concat([new_row_dep, df_dep], ignore_index=True)
-                df_dep_updated.to_csv(DEPOSIT_FILE, index=False, encoding='utf-8-sig')
+                position_store.save_deposits(df_dep_updated, new_row_dep)
                 
                 keys_to_clear_dep = ["sel_dep_owner", "new_dep_owner", "sel_dep_acc", "new_dep_acc", "new_dep_date", "new_dep_amt", "new_dep_memo"]
                 for k in keys_to_clear_dep:
@@ -261,7 +271,7 @@ with tab3:
         if new_orders:
             df_to_save = df_stock.drop(columns=['종목명'], errors='ignore')
             df_stock_updated = pd.concat([df_to_save, pd.DataFrame(new_orders)], ignore_index=True)
-            df_stock_updated.to_csv(PORTFOLIO_FILE, index=False, encoding='utf-8-sig')
+            position_store.save_trades(df_stock_updated, new_orders)
             edited_rec.to_csv(RECURRING_FILE, index=False, encoding='utf-8-sig')
             st.success(f"🎉 성공! 총 {len(new_orders)}일 치의 자동 매수 영수증이 발급되었습니다!")
             st.rerun()
@@ -270,13 +280,16 @@ with tab3:
 
 st.write("")
 if st.button("💾 ☝️ 표 안에서 직접 수정한 내용들 [최종 저장] 하기", type="primary", use_container_width=True):
-    edited_stock.drop(columns=['종목명'], errors='ignore').to_csv(PORTFOLIO_FILE, index=False, encoding='utf-8-sig')
-    edited_dep.to_csv(DEPOSIT_FILE, index=False, encoding='utf-8-sig')
+    # 과거 줄을 고치거나 지운 경우라 보유 현황 합계표는 처음부터 다시 계산합니다.
+    position_store.save_edited(edited_stock.drop(columns=['종목명'], errors='ignore'), edited_dep)
     st.success("✅ 표 수정 내역 완벽하게 저장 완료!")
     st.rerun()
 
 st.write("---")
 
+# 요약/시뮬레이션은 저장된 장부 기준이라, 위 표에 저장 안 한 수정이 있는 편집기를 기억해 둡니다.
+unsaved_editors = [k for k in ["stock", "deposit", "recurring"] if any(st.session_state.get(k, {}).get(f) for f in ["edited_rows", "added_rows", "deleted_rows"])]
+
 st.subheader("📊 2. 사람별/계좌별 전체 자산 요약")
 all_owners = df_stock["소유자"].dropna().unique().tolist() if not df_stock.empty else []
 all_accs = df_stock["계좌명"].dropna().unique().tolist() if not df_stock.empty else []
@@ -299,35 +312,32 @@ if summary_submit:
         st.session_state.summary_accs = selected_accs
         st.session_state.show_summary = True
         
-        fs_raw = edited_stock[(edited_stock["소유자"].isin(selected_owners)) & (edited_stock["계좌명"].isin(selected_accs))]
+        fs_raw = df_stock[(df_stock["소유자"].isin(selected_owners)) & (df_stock["계좌명"].isin(selected_accs))]
         avail_codes = fs_raw['종목코드(6자리)'].unique().tolist()
         avail_names = [stock_dict.get(str(c).split('.')[0].zfill(6), f"알 수 없는 종목({c})") for c in avail_codes]
         st.session_state.graph_stocks = avail_names
 
 if st.session_state.show_summary:
-    with st.spinner("자산을 계산하고 주가를 불러오는 중입니다..."):
-        fs_stock = edited_stock[(edited_stock["소유자"].isin(st.session_state.summary_owners)) & (edited_stock["계좌명"].isin(st.session_state.summary_accs))].copy()
-        fs_dep = edited_dep[(edited_dep["소유자"].isin(st.session_state.summary_owners)) & (edited_dep["계좌명"].isin(st.session_state.summary_accs))].copy()
-
-        fs_dep["입금액"] = pd.to_numeric(fs_dep["입금액"], errors='coerce').fillna(0)
-        dep_summary = fs_dep.groupby(["소유자", "계좌명"])["입금액"].sum().reset_index()
-        dep_summary.rename(columns={"입금액": "총입금액"}, inplace=True)
+    # 요약 전광판/비중/추이 그래프는 모두 저장된 장부 기준이라, 표에 저장 안 한 수정이 있으면 알려줍니다.
+    if "stock" in unsaved_editors or "deposit" in unsaved_editors:
+        st.warning("⚠️ 위 표에 아직 [최종 저장] 하지 않은 수정 내용이 있습니다. 아래 요약은 저장된 장부 기준이며, 저장하면 반영됩니다.")
 
+    with st.spinner("자산을 계산하고 주가를 불러오는 중입니다..."):
+        fs_stock = df_stock[(df_stock["소유자"].isin(st.session_state.summary_owners)) & (df_stock["계좌명"].isin(st.session_state.summary_accs))].copy()
         fs_stock["거래단가"] = pd.to_numeric(fs_stock["거래단가"], errors='coerce').fillna(0)
         fs_stock["수량"] = pd.to_numeric(fs_stock["수량"], errors='coerce').fillna(0)
-        fs_stock["현금흐름"] = fs_stock.apply(lambda x: -1 * x["거래단가"] * x["수량"] if x["거래종류"] == "매수" else x["거래단가"] * x["수량"], axis=1)
-        
-        buys = fs_stock[fs_stock["거래종류"] == "매수"].groupby(["소유자", "계좌명", "종목코드(6자리)"]).agg(총매수수량=("수량", "sum"), 총매수쓴돈=("현금흐름", lambda x: -x.sum())).reset_index()
-        buys["평균매수단가"] = (buys["총매수쓴돈"] / buys["총매수수량"]).fillna(0)
 
-        sells = fs_stock[fs_stock["거래종류"] == "매도"].groupby(["소유자", "계좌명", "종목코드(6자리)"]).agg(총매도수량=("수량", "sum")).reset_index()
-        stock_merged = pd.merge(buys, sells, on=["소유자", "계좌명", "종목코드(6자리)"], how="left").fillna(0)
+        # 종목별/계좌별 합계는 저장된 보유 현황 합계표에서 바로 꺼냅니다 (장부 전체를 다시 묶지 않음).
+        positions, dep_summary = position_store.lookup(st.session_state.summary_owners, st.session_state.summary_accs)
+
+        stock_merged = positions[positions["총매수수량"] > 0].copy()
+        stock_merged["평균매수단가"] = (stock_merged["총매수쓴돈"] / stock_merged["총매수수량"]).fillna(0)
         stock_merged["잔여수량"] = stock_merged["총매수수량"] - stock_merged["총매도수량"]
         stock_merged = stock_merged[stock_merged["잔여수량"] > 0]
         stock_merged["주식투자원금"] = stock_merged["잔여수량"] * stock_merged["평균매수단가"]
 
         current_prices = {}
-        for code in fs_stock["종목코드(6자리)"].dropna().unique():
+        for code in stock_merged["종목코드(6자리)"].dropna().unique():
             clean_code = str(code).split('.')[0].zfill(6)
             try:
                 current_prices[clean_code] = int(fdr.DataReader(clean_code).iloc[-1]['Close'])
@@ -341,7 +351,8 @@ if st.session_state.show_summary:
         
         stock_merged["현재평가금액"] = stock_eval_list
         stock_summary = stock_merged.groupby(["소유자", "계좌명"]).agg(주식투자원금=("주식투자원금", "sum"), 주식평가금액=("현재평가금액", "sum")).reset_index()
-        stock_cash_flow = fs_stock.groupby(["소유자", "계좌명"])["현금흐름"].sum().reset_index()
+        positions["현금흐름"] = positions["총매도받은돈"] - positions["총매수쓴돈"]
+        stock_cash_flow = positions.groupby(["소유자", "계좌명"])["현금흐름"].sum().reset_index()
 
         account_summary = pd.merge(dep_summary, stock_cash_flow, on=["소유자", "계좌명"], how="outer").fillna(0)
         account_summary = pd.merge(account_summary, stock_summary, on=["소유자", "계좌명"], how="outer").fillna(0)
@@ -657,7 +668,205 @@ if st.session_state.get("show_mdd"):
 
 
 st.write("---")
-st.subheader("💬 5. AI 멘토와 실시간 대화하기 (포메뽀꼬 모드)")
+st.subheader("🧪 5. 바겐세일 시그널 백테스트 (과거 성적표)")
+st.info("💡 4번 스캐너의 '고점 대비 -5% → 2배, -10% → 3배' 규칙을 매일(영업일) 적립식에 얹었을 때 과거에 어땠는지, 여러 기준 조합을 한꺼번에 비교합니다. 주가는 로컬 캐시(price_cache 폴더)에 저장되어 다음부터는 마지막 거래일 이후 구간만 새로 받아옵니다.")
+
+with st.form("backtest_form"):
+    col_b1, col_b2 = st.columns([2, 1])
+    selected_bt_names = col_b1.multiselect("📈 백테스트할 종목", all_krx_names, default=default_target_names)
+    bt_start = col_b2.date_input("📅 시작일", value=datetime.today() - timedelta(days=365 * 10))
+
+    col_b3, col_b4, col_b5 = st.columns(3)
+    bt_lookback = col_b3.slider("⏱️ 고점 기간 범위 (일)", 10, 180, (10, 120), step=10)
+    bt_2x = col_b4.slider("🟡 2배 투입 하락률 범위 (%)", 1.0, 20.0, (2.0, 10.0), step=0.5)
+    bt_3x = col_b5.slider("🚨 3배 투입 하락률 범위 (%)", 2.0, 40.0, (5.0, 20.0), step=1.0)
+
+    col_b6, col_b7 = st.columns(2)
+    bt_qty = col_b6.number_input("📦 1회 기본 매수수량 (주)", min_value=1.0, value=1.0, step=1.0)
+    bt_parallel = col_b7.checkbox("⚡ 종목별로 CPU 여러 개 동시에 쓰기", value=True)
+
+    st.write("")
+    backtest_submit = st.form_submit_button("🧪 백테스트 실행", type="primary", use_container_width=True)
+
+if backtest_submit:
+    if not selected_bt_names:
+        st.warning("⚠️ 백테스트할 종목을 1개 이상 선택해주세요.")
+        st.session_state.show_backtest = False
+    else:
+        name_to_code = {v: k for k, v in stock_dict.items()}
+        lookbacks = list(range(bt_lookback[0], bt_lookback[1] + 1, 10))
+        thresholds_2x = [x / 2 for x in range(int(bt_2x[0] * 2), int(bt_2x[1] * 2) + 1)]
+        thresholds_3x = [float(x) for x in range(int(bt_3x[0]), int(bt_3x[1]) + 1)]
+        # 현재 스캐너 규칙(30일, -5%, -10%)은 범위와 상관없이 항상 비교 대상에 넣습니다.
+        lookbacks = sorted(set(lookbacks) | {30})
+        thresholds_2x = sorted(set(thresholds_2x) | {5.0})
+        thresholds_3x = sorted(set(thresholds_3x) | {10.0})
+
+        bt_codes = [name_to_code[n] for n in selected_bt_names if n in name_to_code]
+        with st.spinner("과거 주가를 캐시에서 불러와 모든 기준 조합을 계산 중입니다..."):
+            st.session_state.backtest_results = run_backtest(
+                bt_codes, bt_start.strftime('%Y-%m-%d'), datetime.today().strftime('%Y-%m-%d'),
+                lookbacks, thresholds_2x, thresholds_3x, base_qty=bt_qty,
+                max_workers=os.cpu_count() if bt_parallel else None,
+            )
+        st.session_state.show_backtest = True
+
+if st.session_state.get("show_backtest"):
+    for code, result in st.session_state.backtest_results.items():
+        st.markdown(f"#### 📊 {stock_dict.get(code, code)} ({code})")
+        if result.empty:
+            st.info("해당 기간의 주가 데이터를 불러오지 못했습니다.")
+            continue
+
+        current_rule = result[(result["고점기간(일)"] == 30) & (result["2배 기준(%)"] == -5.0) & (result["3배 기준(%)"] == -10.0)]
+        best = result.iloc[0]
+        col_r1, col_r2, col_r3 = st.columns(3)
+        col_r1.metric("기본 적립식 수익률", f"{best['기본적립 수익률(%)']:.2f}%")
+        if not current_rule.empty:
+            col_r2.metric("현재 규칙 (30일 · -5% · -10%)", f"{current_rule.iloc[0]['수익률(%)']:.2f}%", f"{current_rule.iloc[0]['초과수익률(%p)']:+.2f}%p")
+        col_r3.metric(f"최고 조합 ({int(best['고점기간(일)'])}일 · {best['2배 기준(%)']:g}% · {best['3배 기준(%)']:g}%)", f"{best['수익률(%)']:.2f}%", f"{best['초과수익률(%p)']:+.2f}%p")
+
+        st.caption(f"총 {len(result):,}개 조합 중 수익률 상위 10개")
+        st.dataframe(result.head(10).style.format({
+            "2배 기준(%)": "{:g}%", "3배 기준(%)": "{:g}%", "총투자금": "{:,.0f}원", "최종평가금": "{:,.0f}원",
+            "평균매수단가": "{:,.0f}원", "수익률(%)": "{:.2f}%", "기본적립 수익률(%)": "{:.2f}%", "초과수익률(%p)": "{:+.2f}%p",
+        }), use_container_width=True, hide_index=True)
+
+
+st.write("---")
+st.subheader("🔮 6. 은퇴 시뮬레이션 (몬테카를로 미래 예측)")
+st.info("💡 지금 보유 수량과 예수금에서 출발해, 적립식 봇 설정과 매달 입금을 그대로 이어갔을 때 미래 자산이 어떻게 퍼질지 과거 수익률을 무작위로 다시 뽑아 수만 번 시뮬레이션합니다.")
+
+with st.form("mc_form"):
+    col_m1, col_m2 = st.columns(2)
+    mc_owners = col_m1.multiselect("👤 사람 선택", all_owners, default=all_owners)
+    mc_accs = col_m2.multiselect("🏦 계좌 선택", all_accs, default=all_accs)
+
+    col_m3, col_m4, col_m5 = st.columns(3)
+    mc_years = col_m3.slider("⏳ 은퇴까지 남은 기간 (년)", 1, 40, 20)
+    mc_paths = col_m4.select_slider("🎲 시뮬레이션 횟수", options=[5000, 10000, 20000, 50000, 100000], value=20000)
+    mc_hist_years = col_m5.slider("📚 참고할 과거 수익률 기간 (년)", 1, 20, 10)
+    mc_hist_note = col_m5.empty()
+
+    col_m6, col_m7, col_m8 = st.columns(3)
+    mc_method = col_m6.radio("🔀 수익률 뽑는 방식", SIM_METHODS, index=1)
+    mc_auto_dep = col_m7.checkbox("🏦 과거 월평균 입금액 그대로 사용", value=True)
+    mc_dep = col_m7.number_input("💵 매달 입금액 (원, 직접 입력 시)", min_value=0, value=0, step=100000)
+    mc_parallel = col_m8.checkbox("⚡ CPU 여러 개 동시에 쓰기", value=True)
+
+    st.write("")
+    mc_submit = st.form_submit_button("🔮 미래 시뮬레이션 실행", type="primary", use_container_width=True)
+
+if mc_submit:
+    if not mc_owners or not mc_accs:
+        st.warning("⚠️ 사람과 계좌를 각각 1개 이상 선택해주세요.")
+        st.session_state.show_mc = False
+    else:
+        # 2번 요약과 같은 저장된 장부에서 출발해야 두 화면의 현재 자산이 어긋나지 않습니다.
+        if unsaved_editors:
+            st.warning("⚠️ 위 표에 아직 저장하지 않은 수정 내용이 있습니다. 시뮬레이션은 저장된 장부와 적립식 설정 기준입니다.")
+        mc_stock = df_stock[(df_stock["소유자"].isin(mc_owners)) & (df_stock["계좌명"].isin(mc_accs))].copy()
+        mc_dep_df = df_dep[(df_dep["소유자"].isin(mc_owners)) & (df_dep["계좌명"].isin(mc_accs))].copy()
+        mc_rec = df_rec[(df_rec["소유자"].isin(mc_owners)) & (df_rec["계좌명"].isin(mc_accs)) & (df_rec["매수주기"] == "매일(영업일)")].copy()
+
+        mc_stock["코드"] = mc_stock["종목코드(6자리)"].apply(lambda x: str(x).split('.')[0].zfill(6))
+        mc_stock["거래단가"] = pd.to_numeric(mc_stock["거래단가"], errors='coerce').fillna(0)
+        mc_stock["수량"] = pd.to_numeric(mc_stock["수량"], errors='coerce').fillna(0)
+        mc_stock["수량변화"] = mc_stock.apply(lambda x: x["수량"] if x["거래종류"] == "매수" else -x["수량"], axis=1)
+        mc_stock["현금흐름"] = -mc_stock["수량변화"] * mc_stock["거래단가"]
+        held = mc_stock.groupby("코드")["수량변화"].sum()
+        held = held[held > 0]
+
+        mc_dep_df["입금액"] = pd.to_numeric(mc_dep_df["입금액"], errors='coerce').fillna(0)
+        mc_cash = float(mc_dep_df["입금액"].sum() + mc_stock["현금흐름"].sum())
+
+        mc_rec = mc_rec.dropna(subset=["종목코드(6자리)"])
+        mc_rec["코드"] = mc_rec["종목코드(6자리)"].apply(lambda x: str(x).split('.')[0].zfill(6))
+        mc_rec["1회매수수량"] = pd.to_numeric(mc_rec["1회매수수량"], errors='coerce').fillna(1)
+        rec_qty = mc_rec.groupby("코드")["1회매수수량"].sum()
+
+        if mc_auto_dep:
+            dep_dates = pd.to_datetime(mc_dep_df["입금일자"], errors='coerce').dropna()
+            if dep_dates.empty:
+                monthly_dep = 0.0
+            else:
+                n_months = max((pd.Timestamp.today().to_period("M") - dep_dates.min().to_period("M")).n + 1, 1)
+                monthly_dep = float(mc_dep_df["입금액"].sum()) / n_months
+        else:
+            monthly_dep = float(mc_dep)
+
+        mc_codes = sorted(set(held.index) | set(rec_qty.index))
+        with st.spinner("과거 수익률을 캐시에서 불러와 수만 개의 미래를 그려보는 중입니다..."):
+            hist_start = (datetime.today() - timedelta(days=365 * mc_hist_years)).strftime('%Y-%m-%d')
+            mc_returns, mc_last, mc_hist = load_return_matrix(mc_codes, hist_start)
+            used_codes = list(mc_returns.columns)
+            missing_codes = [c for c in mc_codes if c not in used_codes]
+
+            if mc_returns.empty or len(mc_returns) < MIN_HISTORY_DAYS:
+                st.session_state.mc_result = None
+            else:
+                st.session_state.mc_result = run_simulation(
+                    mc_returns, mc_last,
+                    shares0=held.reindex(used_codes).fillna(0).to_numpy(),
+                    cash0=mc_cash,
+                    daily_qty=rec_qty.reindex(used_codes).fillna(0).to_numpy(),
+                    monthly_deposit=monthly_dep, years=mc_years, n_paths=mc_paths, method=mc_method,
+                    max_workers=os.cpu_count() if mc_parallel else None,
+                    paid_in0=float(mc_dep_df["입금액"].sum()),
+                )
+        st.session_state.mc_info = {"codes": used_codes, "missing": missing_codes, "hist": mc_hist, "monthly_dep": monthly_dep, "paths": mc_paths}
+        st.session_state.show_mc = True
+
+if st.session_state.get("show_mc"):
+    mc_result = st.session_state.mc_result
+    mc_info = st.session_state.mc_info
+    mc_hist = mc_info["hist"]
+
+    # 요청한 기간보다 실제로 쓴 수익률 기간이 짧거나, 늦게 상장된 종목을 다른 종목으로 대신 채웠다면 슬라이더 바로 아래에 알려줍니다.
+    hist_notes = [f"{stock_dict.get(c, c)}: 상장 전 구간은 {stock_dict.get(p, p)} 수익률로 대체" for c, p in mc_hist["proxies"].items()]
+    if mc_hist["history_start"] is not None and mc_hist["history_start"] > mc_hist["requested_start"] + timedelta(days=31):
+        hist_notes.insert(0, f"실제 사용 기간: {mc_hist['history_start'].strftime('%Y-%m-%d')}부터 {mc_hist['days']:,}거래일 (요청보다 짧음)")
+    if hist_notes:
+        mc_hist_note.warning("⚠️ " + " · ".join(hist_notes))
+    elif mc_hist["history_start"] is not None:
+        mc_hist_note.caption(f"✅ {mc_hist['history_start'].strftime('%Y-%m-%d')}부터 {mc_hist['days']:,}거래일 사용")
+
+    if mc_info["missing"]:
+        st.warning(f"⚠️ 주가 데이터를 불러오지 못해 시뮬레이션에서 빠진 종목: {', '.join(stock_dict.get(c, c) for c in mc_info['missing'])}")
+
+    if mc_result is None:
+        st.info(f"시뮬레이션에 쓸 과거 주가 데이터가 부족합니다. (최소 {MIN_HISTORY_DAYS}거래일 필요)")
+    else:
+        st.caption(f"📚 {', '.join(stock_dict.get(c, c) for c in mc_info['codes'])} 의 공통 거래일 {mc_hist['days']:,}일 수익률 사용 · 월 입금 {int(mc_info['monthly_dep']):,}원 · {mc_info['paths']:,}회 시뮬레이션")
+
+        final = mc_result.iloc[-1]
+        if (mc_result["P5"] < 0).any():
+            st.warning("⚠️ 적립식 매수 금액이 입금액보다 커서 예수금이 마이너스로 내려가는 경로가 있습니다. 봇 설정이나 월 입금액을 확인해 보세요.")
+        if final["구간밖경로수"] > 0:
+            st.caption(f"ℹ️ {int(final['구간밖경로수']):,}개 경로가 분포표 범위를 벗어나 실제 최솟값/최댓값으로 처리되었습니다.")
+        col_f1, col_f2, col_f3, col_f4 = st.columns(4)
+        col_f1.metric("💵 누적 납입 원금", f"{int(final['누적납입원금']):,}원")
+        col_f2.metric("😰 하위 5% (운 나쁠 때)", f"{int(final['P5']):,}원")
+        col_f3.metric("😐 중간값", f"{int(final['P50']):,}원")
+        col_f4.metric("😄 상위 5% (운 좋을 때)", f"{int(final['P95']):,}원")
+
+        fig_mc = go.Figure()
+        fig_mc.add_trace(go.Scatter(x=mc_result.index, y=mc_result["P95"], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'))
+        fig_mc.add_trace(go.Scatter(x=mc_result.index, y=mc_result["P5"], mode='lines', name='5~95% 범위', fill='tonexty', line=dict(width=0), fillcolor='rgba(0, 204, 150, 0.15)'))
+        fig_mc.add_trace(go.Scatter(x=mc_result.index, y=mc_result["P75"], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'))
+        fig_mc.add_trace(go.Scatter(x=mc_result.index, y=mc_result["P25"], mode='lines', name='25~75% 범위', fill='tonexty', line=dict(width=0), fillcolor='rgba(0, 204, 150, 0.35)'))
+        fig_mc.add_trace(go.Scatter(x=mc_result.index, y=mc_result["P50"], mode='lines', name='중간값', line=dict(color='#00cc96', width=3)))
+        fig_mc.add_trace(go.Scatter(x=mc_result.index, y=mc_result["누적납입원금"], mode='lines', name='누적 납입 원금', line=dict(color='#ef553b', width=2, dash='dash')))
+        fig_mc.update_layout(
+            hovermode="x unified", margin=dict(t=30, b=0, l=0, r=0), legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+            xaxis=dict(title="", tickformat="%Y년", hoverformat="%Y년 %m월", showgrid=True),
+            yaxis=dict(title="", tickformat=",", ticksuffix="원", showgrid=True)
+        )
+        st.plotly_chart(fig_mc, use_container_width=True)
+
+
+st.write("---")
+st.subheader("💬 7. AI 멘토와 실시간 대화하기 (포메뽀꼬 모드)")
 st.info("💡 위에서 즐겨찾기 한 글로벌 시황 사이트들을 볼 시간이 없다면, 아래의 [시황 브리핑] 버튼을 눌러 AI에게 대신 요약을 부탁해보세요!")
 
 if not api_key:
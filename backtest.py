@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from price_cache import clean_code, load_price_history
+
+# ==============================================================================
+# 🧪 바겐세일(낙폭) 레버리지 시그널 백테스터
+#   - 4번 스캐너와 같은 규칙: 최근 N일(달력 기준) 고가 대비 종가 하락률
+#   - 하락률이 -2배 기준 이하면 2배, -3배 기준 이하면 3배 수량으로 적립식 매수
+#   - 적립식 봇과 같은 '매일(영업일)' 주기, 종가 체결
+# ==============================================================================
+BUY_CYCLES = ["매일(영업일)"]
+
+
+def schedule_mask(index, cycle="매일(영업일)"):
+    """적립식 봇의 매수주기에 해당하는 거래일을 True 로 표시합니다."""
+    if cycle == "매일(영업일)":
+        return np.ones(len(index), dtype=bool)
+    raise ValueError(f"지원하지 않는 매수주기입니다: {cycle}")
+
+
+def drawdown_matrix(price_df, lookbacks):
+    """lookback 별 '최근 N일 고가 대비 종가 하락률(%)' 을 (lookback 수, 거래일 수) 배열로 만듭니다."""
+    high = price_df["High"].astype(float)
+    close = price_df["Close"].astype(float).to_numpy()
+    rows = []
+    for days in lookbacks:
+        # 스캐너가 fdr.DataReader(code, 오늘-N일, 오늘) 로 N일 전 당일까지 포함하므로 양 끝을 모두 닫습니다.
+        rolling_high = high.rolling(f"{int(days)}D", min_periods=1, closed="both").max().to_numpy()
+        rows.append((close - rolling_high) / rolling_high * 100)
+    return np.vstack(rows)
+
+
+def run_signal_grid(price_df, lookbacks, thresholds_2x, thresholds_3x, base_qty=1.0, cycle="매일(영업일)", start=None):
+    """모든 (lookback, 2배 기준, 3배 기준) 조합을 한 번의 배열 연산으로 평가합니다.
+
+    기준값은 양수 하락폭(예: 5 → -5%)으로 받으며, 3배 기준이 2배 기준보다 얕은 조합은 건너뜁니다.
+    start 이전 데이터는 고점 계산(워밍업)에만 쓰고 매수는 start 부터 시작합니다.
+    """
+    price_df = price_df.dropna(subset=["High", "Close"])
+    price_df = price_df[price_df["Close"] > 0]
+    if price_df.empty:
+        return pd.DataFrame()
+
+    lookbacks = np.asarray(lookbacks, dtype=float)
+    t2 = np.asarray(thresholds_2x, dtype=float)
+    t3 = np.asarray(thresholds_3x, dtype=float)
+    dd = drawdown_matrix(price_df, lookbacks)                 # (L, T)
+    if start is not None:
+        in_range = price_df.index >= pd.to_datetime(start)
+        if not in_range.any():
+            return pd.DataFrame()
+        price_df = price_df[in_range]
+        dd = dd[:, in_range]
+    close = price_df["Close"].astype(float).to_numpy()
+    buy_day = schedule_mask(price_df.index, cycle)
+
+    buy_close = close * buy_day
+    hit_2x = (dd[:, None, :] <= -t2[None, :, None]) & buy_day    # (L, T2, T)
+    hit_3x = (dd[:, None, :] <= -t3[None, :, None]) & buy_day    # (L, T3, T)
+
+    # 배수 = 1 + (2배 조건) + (3배 조건) 이므로 합계는 조건별로 따로 더해 조합합니다.
+    # (L, T2, T3, T) 4차원 배열을 만들지 않아 조합이 수천 개여도 메모리가 거의 늘지 않습니다.
+    cnt_2x, cost_2x = hit_2x.sum(axis=-1), hit_2x @ buy_close      # (L, T2)
+    cnt_3x, cost_3x = hit_3x.sum(axis=-1), hit_3x @ buy_close      # (L, T3)
+
+    total_qty = base_qty * (buy_day.sum() + cnt_2x[:, :, None] + cnt_3x[:, None, :])
+    total_cost = base_qty * (buy_close.sum() + cost_2x[:, :, None] + cost_3x[:, None, :])
+    final_value = total_qty * close[-1]
+
+    # 3배 기준이 더 깊으므로 3배 투입일은 항상 2배 조건도 만족합니다.
+    days_3x = np.broadcast_to(cnt_3x[:, None, :], total_qty.shape)
+    days_2x = cnt_2x[:, :, None] - days_3x
+
+    # 비교 기준: 시그널 없이 매일 base_qty 만 사는 기존 적립식
+    base_cost = base_qty * (close * buy_day).sum()
+    base_value = base_qty * buy_day.sum() * close[-1]
+    base_return = (base_value / base_cost - 1) * 100 if base_cost > 0 else 0.0
+
+    L, T2, T3 = np.meshgrid(lookbacks, t2, t3, indexing="ij")
+    valid = T3 > T2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.where(total_cost > 0, (final_value / total_cost - 1) * 100, 0.0)
+        avg_price = np.where(total_qty > 0, total_cost / total_qty, 0.0)
+
+    result = pd.DataFrame({
+        "고점기간(일)": L[valid].astype(int),
+        "2배 기준(%)": -T2[valid],
+        "3배 기준(%)": -T3[valid],
+        "2배 투입일수": days_2x[valid],
+        "3배 투입일수": days_3x[valid],
+        "총투자금": total_cost[valid],
+        "최종평가금": final_value[valid],
+        "평균매수단가": avg_price[valid],
+        "수익률(%)": returns[valid],
+    })
+    result["기본적립 수익률(%)"] = base_return
+    result["초과수익률(%p)"] = result["수익률(%)"] - base_return
+    return result.sort_values("수익률(%)", ascending=False).reset_index(drop=True)
+
+
+def _backtest_ticker(args):
+    code, start, end, lookbacks, thresholds_2x, thresholds_3x, base_qty = args
+    # 고점 계산용으로 가장 긴 lookback 만큼 앞 데이터를 더 읽어 둡니다.
+    warmup_start = pd.to_datetime(start) - pd.Timedelta(days=int(max(lookbacks)))
+    price_df = load_price_history(code, warmup_start, end)
+    return code, run_signal_grid(price_df, lookbacks, thresholds_2x, thresholds_3x, base_qty, start=start)
+
+
+def run_backtest(codes, start, end, lookbacks, thresholds_2x, thresholds_3x, base_qty=1.0, max_workers=None):
+    """종목별 그리드 결과를 {종목코드: 결과표} 로 돌려줍니다. max_workers 가 2 이상이면 종목을 프로세스별로 나눠 돌립니다."""
+    jobs = [(clean_code(c), start, end, list(lookbacks), list(thresholds_2x), list(thresholds_3x), base_qty) for c in codes]
+    if max_workers and max_workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(jobs))) as pool:
+            return dict(pool.map(_backtest_ticker, jobs))
+    return dict(_backtest_ticker(job) for job in jobs)
@@ -0,0 +1,177 @@
+import os
+import json
+import pandas as pd
+
+# ==============================================================================
+# 📦 보유 현황 미리 계산해 두기 (materialized positions)
+#   - (소유자, 계좌명, 종목코드) 별 매수/매도 합계와 (소유자, 계좌명) 별 입금 합계를 장부 옆에 저장
+#   - 새 매매/봇 영수증/입금은 추가된 줄만 더하고, 표 편집 저장 때만 처음부터 다시 계산
+#   - 스탬프 파일에 장부 파일의 크기/수정시각을 적어 두어, 밖에서 장부를 고치면 자동으로 다시 계산
+#   - 장부를 읽은 뒤 다른 세션이 먼저 저장했다면, 변경분 대신 이번에 저장하는 장부로 다시 계산
+# ==============================================================================
+POSITIONS_FILE = "my_positions.csv"
+ACCOUNT_DEPOSIT_FILE = "my_positions_deposit.csv"
+POSITIONS_STAMP_FILE = "my_positions.json"
+POSITIONS_SCHEMA = 1
+
+POSITION_KEYS = ["소유자", "계좌명", "종목코드(6자리)"]
+ACCOUNT_KEYS = ["소유자", "계좌명"]
+POSITION_COLUMNS = ["총매수수량", "총매수쓴돈", "총매도수량", "총매도받은돈"]
+KEY_DTYPES = {"소유자": str, "계좌명": str, "종목코드(6자리)": str}
+
+
+def aggregate_trades(df_trades):
+    """매매 기록을 (소유자, 계좌명, 종목코드) 별 매수/매도 합계로 묶습니다."""
+    df = df_trades.dropna(subset=POSITION_KEYS)
+    if df.empty:
+        return pd.DataFrame(columns=POSITION_KEYS + POSITION_COLUMNS)
+    price = pd.to_numeric(df["거래단가"], errors='coerce').fillna(0)
+    qty = pd.to_numeric(df["수량"], errors='coerce').fillna(0)
+    is_buy = df["거래종류"] == "매수"
+    is_sell = df["거래종류"] == "매도"
+    agg = pd.DataFrame({
+        "소유자": df["소유자"].astype(str),
+        "계좌명": df["계좌명"].astype(str),
+        "종목코드(6자리)": df["종목코드(6자리)"].astype(str),
+        "총매수수량": qty.where(is_buy, 0),
+        "총매수쓴돈": (price * qty).where(is_buy, 0),
+        "총매도수량": qty.where(is_sell, 0),
+        "총매도받은돈": (price * qty).where(is_sell, 0),
+    })
+    return agg.groupby(POSITION_KEYS, as_index=False, sort=False)[POSITION_COLUMNS].sum()
+
+
+def aggregate_deposits(df_deposits):
+    """입금 기록을 (소유자, 계좌명) 별 총입금액으로 묶습니다."""
+    df = df_deposits.dropna(subset=ACCOUNT_KEYS)
+    if df.empty:
+        return pd.DataFrame(columns=ACCOUNT_KEYS + ["총입금액"])
+    agg = pd.DataFrame({
+        "소유자": df["소유자"].astype(str),
+        "계좌명": df["계좌명"].astype(str),
+        "총입금액": pd.to_numeric(df["입금액"], errors='coerce').fillna(0),
+    })
+    return agg.groupby(ACCOUNT_KEYS, as_index=False, sort=False)["총입금액"].sum()
+
+
+def _add_delta(base, delta, keys):
+    if delta.empty:
+        return base
+    if base.empty:
+        return delta.reset_index(drop=True)
+    merged = pd.concat([base, delta], ignore_index=True)
+    return merged.groupby(keys, as_index=False, sort=False).sum()
+
+
+def _file_signature(path):
+    if not os.path.exists(path):
+        return None
+    info = os.stat(path)
+    return [info.st_size, info.st_mtime_ns]
+
+
+class PositionStore:
+    """장부 CSV 두 개(매매/입금) 옆에 보유 현황 합계표를 두고, 쓰기 경로마다 변경분만 반영합니다."""
+
+    def __init__(self, portfolio_file, deposit_file):
+        self.portfolio_file = portfolio_file
+        self.deposit_file = deposit_file
+        self.positions = None
+        self.deposits = None
+        self.revision = 0
+        self.read_signature = None
+
+    def _ledger_signature(self):
+        return {"portfolio": _file_signature(self.portfolio_file), "deposit": _file_signature(self.deposit_file)}
+
+    def _read_stamp(self):
+        try:
+            with open(POSITIONS_STAMP_FILE, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self):
+        self.revision += 1
+        self.positions.to_csv(POSITIONS_FILE, index=False, encoding='utf-8-sig')
+        self.deposits.to_csv(ACCOUNT_DEPOSIT_FILE, index=False, encoding='utf-8-sig')
+        stamp = {"schema": POSITIONS_SCHEMA, "revision": self.revision, "ledger": self._ledger_signature()}
+        with open(POSITIONS_STAMP_FILE, "w", encoding='utf-8') as f:
+            json.dump(stamp, f)
+
+    def rebuild(self, df_stock=None, df_dep=None):
+        """장부 전체를 다시 집계합니다. 표를 넘기지 않으면 디스크의 장부 파일을 읽습니다."""
+        if df_stock is None:
+            df_stock = pd.read_csv(self.portfolio_file, dtype=KEY_DTYPES, encoding='utf-8-sig')
+        if df_dep is None:
+            df_dep = pd.read_csv(self.deposit_file, dtype={"소유자": str, "계좌명": str}, encoding='utf-8-sig')
+        self.positions = aggregate_trades(df_stock)
+        self.deposits = aggregate_deposits(df_dep)
+        self._save()
+
+    def load(self):
+        """저장된 합계표를 읽고, 스탬프가 현재 장부와 다르면(스키마 변경/외부 수정) 다시 집계합니다."""
+        stamp = self._read_stamp()
+        fresh = (
+            stamp is not None
+            and stamp.get("schema") == POSITIONS_SCHEMA
+            and stamp.get("ledger") == self._ledger_signature()
+            and os.path.exists(POSITIONS_FILE)
+            and os.path.exists(ACCOUNT_DEPOSIT_FILE)
+        )
+        if fresh:
+            self.revision = stamp.get("revision", 0)
+            self.positions = pd.read_csv(POSITIONS_FILE, dtype=KEY_DTYPES, encoding='utf-8-sig')
+            self.deposits = pd.read_csv(ACCOUNT_DEPOSIT_FILE, dtype={"소유자": str, "계좌명": str}, encoding='utf-8-sig')
+        else:
+            self.revision = stamp.get("revision", 0) if stamp else 0
+            self.rebuild()
+        return self
+
+    def mark_read(self):
+        """장부 CSV 를 읽기 직전에 불러, 이번 실행이 본 장부 파일의 크기/수정시각을 기억해 둡니다."""
+        self.read_signature = self._ledger_signature()
+        return self
+
+    def _changed_since_read(self, key):
+        return self.read_signature is not None and self.read_signature[key] != self._ledger_signature()[key]
+
+    def save_trades(self, df_ledger, new_rows):
+        """매매 장부(df_ledger, new_rows 포함)를 저장하고 합계표에는 new_rows 만 더합니다."""
+        if self._changed_since_read("portfolio"):
+            # 읽은 뒤 다른 세션이 장부를 저장했으면, 덮어쓰는 df_ledger 기준으로 처음부터 다시 집계합니다.
+            df_ledger.to_csv(self.portfolio_file, index=False, encoding='utf-8-sig')
+            self.rebuild(df_ledger, None)
+        else:
+            self.load()  # 장부를 덮어쓰기 전에 합계표가 최신인지 먼저 확인해야 변경분이 두 번 더해지지 않습니다.
+            df_ledger.to_csv(self.portfolio_file, index=False, encoding='utf-8-sig')
+            self.positions = _add_delta(self.positions, aggregate_trades(pd.DataFrame(new_rows)), POSITION_KEYS)
+            self._save()
+        self.mark_read()
+
+    def save_deposits(self, df_ledger, new_rows):
+        """입금 장부(df_ledger, new_rows 포함)를 저장하고 합계표에는 new_rows 만 더합니다."""
+        if self._changed_since_read("deposit"):
+            df_ledger.to_csv(self.deposit_file, index=False, encoding='utf-8-sig')
+            self.rebuild(None, df_ledger)
+        else:
+            self.load()
+            df_ledger.to_csv(self.deposit_file, index=False, encoding='utf-8-sig')
+            self.deposits = _add_delta(self.deposits, aggregate_deposits(pd.DataFrame(new_rows)), ACCOUNT_KEYS)
+            self._save()
+        self.mark_read()
+
+    def save_edited(self, df_stock, df_dep):
+        """표 편집기에서 과거 줄을 고치거나 지웠을 때: 두 장부를 저장하고 처음부터 다시 집계합니다."""
+        df_stock.to_csv(self.portfolio_file, index=False, encoding='utf-8-sig')
+        df_dep.to_csv(self.deposit_file, index=False, encoding='utf-8-sig')
+        self.rebuild(df_stock, df_dep)
+        self.mark_read()
+
+    def lookup(self, owners, accs):
+        """선택한 사람/계좌의 (종목별 합계, 계좌별 입금 합계) 를 돌려줍니다."""
+        if self.positions is None:
+            self.load()
+        pos = self.positions[self.positions["소유자"].isin(owners) & self.positions["계좌명"].isin(accs)]
+        dep = self.deposits[self.deposits["소유자"].isin(owners) & self.deposits["계좌명"].isin(accs)]
+        return pos.reset_index(drop=True), dep.reset_index(drop=True)
@@ -0,0 +1,94 @@
+import os
+import json
+import pandas as pd
+import FinanceDataReader as fdr
+from datetime import datetime
+
+# ==============================================================================
+# 💾 로컬 주가 캐시 (종목별 CSV 한 개씩, 모자란 날짜만 거래소에서 채워 넣음)
+# ==============================================================================
+PRICE_CACHE_DIR = "price_cache"
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def clean_code(code):
+    return str(code).split('.')[0].zfill(6)
+
+
+def cache_path(code):
+    return os.path.join(PRICE_CACHE_DIR, f"{clean_code(code)}.csv")
+
+
+def read_cached_prices(code):
+    """캐시 파일만 읽습니다. 파일이 없으면 빈 표를 돌려줍니다."""
+    path = cache_path(code)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=PRICE_COLUMNS, index=pd.DatetimeIndex([], name="Date"))
+    df = pd.read_csv(path, index_col=0, parse_dates=True, encoding='utf-8-sig')
+    df.index.name = "Date"
+    return df
+
+
+def meta_path(code):
+    return os.path.join(PRICE_CACHE_DIR, f"{clean_code(code)}.json")
+
+
+def read_covered_from(code):
+    """이 날짜부터는 캐시가 빠짐없이 채워져 있다고 기록해 둔 날짜 (상장 전 구간을 매번 다시 묻지 않기 위함)."""
+    try:
+        with open(meta_path(code), encoding='utf-8') as f:
+            return pd.to_datetime(json.load(f)["covered_from"])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def write_covered_from(code, date):
+    os.makedirs(PRICE_CACHE_DIR, exist_ok=True)
+    with open(meta_path(code), "w", encoding='utf-8') as f:
+        json.dump({"covered_from": date.strftime('%Y-%m-%d')}, f)
+
+
+def load_price_history(code, start, end=None, refresh=True):
+    """start~end 구간의 일봉을 캐시에서 꺼내고, 캐시에 없는 앞/뒤 구간만 fdr 로 받아 저장합니다."""
+    code = clean_code(code)
+    start = pd.to_datetime(start).normalize()
+    end = pd.to_datetime(end if end is not None else datetime.today()).normalize()
+    cached = read_cached_prices(code)
+
+    if refresh:
+        covered_from = read_covered_from(code)
+        if covered_from is None and not cached.empty:
+            covered_from = cached.index.min()
+
+        missing = []
+        if cached.empty:
+            missing.append((start, end))
+        else:
+            # 상장일 이전처럼 받아도 비어 있는 구간은 한 번 확인한 뒤로는 다시 묻지 않습니다.
+            if start < covered_from:
+                missing.append((start, covered_from - pd.Timedelta(days=1)))
+            # 장중에 저장된 당일 봉은 미완성일 수 있어 마지막 저장일부터 다시 받아 덮어씁니다.
+            if end >= cached.index.max():
+                missing.append((cached.index.max(), end))
+
+        fetched = []
+        for s, e in missing:
+            try:
+                part = fdr.DataReader(code, s.strftime('%Y-%m-%d'), e.strftime('%Y-%m-%d'))
+            except:
+                continue # 거래소 서버가 죽어 있어도 캐시에 있는 만큼은 그대로 씁니다.
+            if not part.empty:
+                fetched.append(part.reindex(columns=PRICE_COLUMNS))
+            if s <= start and (covered_from is None or start < covered_from):
+                covered_from = start
+
+        if fetched:
+            cached = pd.concat([cached] + fetched)
+            cached = cached[~cached.index.duplicated(keep='last')].sort_index()
+            cached.index.name = "Date"
+            os.makedirs(PRICE_CACHE_DIR, exist_ok=True)
+            cached.to_csv(cache_path(code), encoding='utf-8-sig')
+        if covered_from is not None and covered_from != read_covered_from(code):
+            write_covered_from(code, covered_from)
+
+    return cached.loc[(cached.index >= start) & (cached.index <= end)]